@@ -3,12 +3,14 @@ Watchdog Configuration Management with State Machine Support
 """
 import os
 import re
-import json
-from typing import Dict, List, Optional, Tuple, Union, Set
-from datetime import datetime
+import sys
+import logging
+from typing import Dict, Optional, Tuple, Set
 
 from state_machine import WatchdogStateMachine, WatchdogState, WatchdogTransition
 
+logger = logging.getLogger("watchdog.config")
+
 # Notification Event Constants
 NOTIFY_STATE_ACTIVATED = 'StateActivated'
 NOTIFY_STATE_COMPLETED = 'StateCompleted'
@@ -25,7 +27,32 @@ DEFAULT_NOTIFY_EVENTS = {
     NOTIFY_ENTRY_DETECTED
 }
 
+# Config file patterns, applied to the whole file at once
+_SECTION_RE = re.compile(r'^[ \t]*\[([^\]\n]+)\][ \t]*$', re.M)
+_KV_RE = re.compile(r'^[ \t]*([^#=\s][^=\n]*?)[ \t]*=[ \t]*(.*?)[ \t]*$', re.M)
+
+
+def _iter_config_entries(data: str):
+    """Yield (section, key, value, line_num) for every key=value line in data"""
+    headers = list(_SECTION_RE.finditer(data))
+    bounds = [(None, 0)] + [(m.group(1).strip().lower(), m.end()) for m in headers]
+    ends = [m.start() for m in headers] + [len(data)]
+    
+    for (section, start), end in zip(bounds, ends):
+        line_num = data.count('\n', 0, start) + 1
+        pos = start
+        for match in _KV_RE.finditer(data, start, end):
+            line_num += data.count('\n', pos, match.start())
+            pos = match.start()
+            yield section, match.group(1), match.group(2), line_num
+
+def _is_int_token(token: str) -> bool:
+    """Whether int() accepts token, without using exceptions for control flow"""
+    return token[1:].isdecimal() if token[:1] in ('-', '+') else token.isdecimal()
+
 class EntryNode:
+    __slots__ = ('name', 'node_name', 'description')
+    
     def __init__(self, name: str, node_name: str, description: str = ""):
         self.name = name
         self.node_name = node_name
@@ -35,6 +62,8 @@ class EntryNode:
         return f"EntryNode({self.name}: {self.node_name})"
 
 class CompletionNode:
+    __slots__ = ('name', 'node_name', 'description')
+    
     def __init__(self, name: str, node_name: str, description: str = ""):
         self.name = name
         self.node_name = node_name
@@ -51,17 +80,32 @@ class WatchdogConfig:
         self.entry_nodes: Dict[str, EntryNode] = {}
         self.completion_nodes: Dict[str, CompletionNode] = {}
         
-        # 修复：默认正则同步为严格模式
-        self.log_patterns = {
-            'node_start': r'\[pipeline_data\.name=(.*?)\]\s*\|\s*enter',
-            'node_complete': r'\[pipeline_data\.name=(.*?)\]\s*\|\s*complete',
-        }
+        # Node name -> entry / completion definition, rebuilt by load_config
+        self._entry_by_node: Dict[str, EntryNode] = {}
+        self._completion_by_node: Dict[str, CompletionNode] = {}
+        # UTF-8 node name -> interned name, for every node a rule reacts to
+        self.watched_nodes: Dict[bytes, str] = {}
         
-        self.bot_token = None
-        self.chat_id = None
-        self.webhook_key = None
+        # Log pattern for node detection (matched against raw bytes)
+        # 单次扫描：严格匹配 [pipeline_data.name=...] | enter / complete，
+        # 兼容旧格式 [node_name=...]（排除 list=[...] 和 result.name=... 这种干扰项）
+        # group(1) 为节点名，group(2) 为 enter / complete（通用格式时为 None），
+        # 同一行有多个匹配时由调用方按 enter > complete > 通用 选取一个
+        self.node_re = re.compile(
+            rb'\[(?:node_name|pipeline_data\.name)=([^\]\n]+)\]'
+            rb'(?:[ \t]*\|[ \t]*(enter|complete)|(?!.*(?:list=|result\.name=)))'
+        )
+        
+        # Exposed as properties below so the derived notifier cache stays in sync
+        self._bot_token: Optional[str] = None
+        self._chat_id: Optional[str] = None
+        self._webhook_key: Optional[str] = None
         self.default_ext_notify = None
         
+        # Derived from the notification settings, refreshed whenever one changes
+        self._available_notifiers: Tuple[str, ...] = ()
+        self._notification_configured = False
+        
         # Set of events that should trigger a notification
         # Defaults to all events for backward compatibility
         self.notify_events: Set[str] = DEFAULT_NOTIFY_EVENTS.copy()
@@ -73,56 +117,54 @@ class WatchdogConfig:
         
     def load_config(self, config_path: str) -> bool:
         if not os.path.exists(config_path):
-            print(f"Watchdog config file not found: {config_path}")
+            logger.error("Watchdog config file not found: %s", config_path)
             return False
         
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                current_section = None
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    if line.startswith('[') and line.endswith(']'):
-                        current_section = line[1:-1].lower()
-                        continue
-                    
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        
-                        if current_section == 'notification':
-                            self._parse_notification_config(key, value)
-                        elif current_section == 'monitoring':
-                            self._parse_monitoring_config(key, value)
-                        elif current_section == 'states':
-                            self._parse_state_config(key, value, line_num)
-                        elif current_section == 'entries':
-                            self._parse_entry_config(key, value, line_num)
-                        elif current_section == 'completed':
-                            self._parse_completed_config(key, value, line_num)
-                        elif current_section == 'rules':
-                            self._parse_legacy_as_state_config(key, value, line_num)
+                data = f.read()
+            
+            for current_section, key, value, line_num in _iter_config_entries(data):
+                if current_section == 'notification':
+                    self._parse_notification_config(key, value)
+                elif current_section == 'monitoring':
+                    self._parse_monitoring_config(key, value)
+                elif current_section == 'states':
+                    self._parse_state_config(key, value, line_num)
+                elif current_section == 'entries':
+                    self._parse_entry_config(key, value, line_num)
+                elif current_section == 'completed':
+                    self._parse_completed_config(key, value, line_num)
+                elif current_section == 'rules':
+                    self._parse_legacy_as_state_config(key, value, line_num)
             
-            completion_node_names = {c.node_name for c in self.completion_nodes.values()}
+            self._entry_by_node = {}
+            for entry in self.entry_nodes.values():
+                self._entry_by_node.setdefault(entry.node_name, entry)
+            self._completion_by_node = {}
+            for comp in self.completion_nodes.values():
+                self._completion_by_node.setdefault(comp.node_name, comp)
+            
+            completion_node_names = set(self._completion_by_node)
             self.state_machine.set_completion_nodes(completion_node_names)
             
-            print(f"Loaded {len(self.state_machine.states)} state machine rules")
-            print(f"Loaded {len(self.entry_nodes)} entry nodes")
-            print(f"Loaded {len(self.completion_nodes)} completion nodes")
+            watched = set(self._entry_by_node)
+            watched.update(self.state_machine.states_by_start_node, self.state_machine.states_by_target_node)
+            self.watched_nodes = {name.encode('utf-8'): name for name in watched}
+            
+            logger.info("Loaded %d state machine rules", len(self.state_machine.states))
+            logger.info("Loaded %d entry nodes", len(self.entry_nodes))
+            logger.info("Loaded %d completion nodes", len(self.completion_nodes))
             
             if self._custom_notify_configured:
-                print(f"Notification filter enabled: {', '.join(self.notify_events)}")
+                logger.info("Notification filter enabled: %s", ', '.join(self.notify_events))
             else:
-                print("Notification filter: Default (All events)")
+                logger.info("Notification filter: Default (All events)")
                 
             return True
             
         except Exception as e:
-            print(f"Failed to load watchdog config: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Failed to load watchdog config: %s", e)
             return False
     
     def _parse_notification_config(self, key: str, value: str):
@@ -170,7 +212,7 @@ class WatchdogConfig:
             if part_lower in valid_events:
                 self.notify_events.add(valid_events[part_lower])
             else:
-                print(f"Warning: Unknown notification event type: {part}")
+                logger.warning("Unknown notification event type: %s", part)
 
     def _parse_monitoring_config(self, key: str, value: str):
         if key == 'Log_File_Path':
@@ -181,7 +223,7 @@ class WatchdogConfig:
                 if self.monitor_interval <= 0:
                     self.monitor_interval = 1.0
             except ValueError:
-                print(f"Invalid Monitor_Interval: {value}, using default 1.0")
+                logger.warning("Invalid Monitor_Interval: %s, using default 1.0", value)
         elif key == 'Enable_Stdout_Capture':
             self.enable_stdout_capture = value.lower() in ['true', '1', 'yes', 'on']
     
@@ -200,7 +242,7 @@ class WatchdogConfig:
             state = WatchdogState(name=key, start_node=start_node, transitions=[transition], description=description)
             self.state_machine.add_state(state)
         except (ValueError, IndexError) as e:
-            print(f"Warning: Failed to parse legacy rule at line {line_num}: {key}={value}, error: {e}")
+            logger.warning("Failed to parse legacy rule at line %d: %s=%s, error: %s", line_num, key, value, e)
     
     def _parse_state_config(self, key: str, value: str, line_num: int):
         try:
@@ -210,37 +252,24 @@ class WatchdogConfig:
             if len(parts) < 3:
                 return
             start_node = parts[0]
-            transitions = []
-            description = ""
-            i = 1
-            while i < len(parts):
-                try:
-                    timeout_ms = int(parts[i])
-                    if i + 1 < len(parts):
-                        end_node = parts[i + 1]
-                        has_next_timeout = False
-                        if i + 2 < len(parts):
-                            try:
-                                int(parts[i + 2])
-                                has_next_timeout = True
-                            except ValueError:
-                                pass
-                        transitions.append(WatchdogTransition(end_node, timeout_ms, f"Transition to {end_node}"))
-                        i += 2
-                        if not has_next_timeout and i < len(parts):
-                            description = ', '.join(parts[i:])
-                            break
-                    else:
-                        break
-                except ValueError:
-                    description = ', '.join(parts[i:])
-                    break
+            body = parts[1:]
+            
+            # Leading (timeout, end_node) pairs, the rest is the description
+            pair_end = 0
+            while pair_end + 1 < len(body) and _is_int_token(body[pair_end]):
+                pair_end += 2
+            transitions = [
+                WatchdogTransition(end_node, int(timeout_ms), f"Transition to {end_node}")
+                for timeout_ms, end_node in zip(body[0:pair_end:2], body[1:pair_end:2])
+            ]
+            rest = body[pair_end:]
+            description = "" if len(rest) == 1 and _is_int_token(rest[0]) else ', '.join(rest)
             if not transitions:
                 return
             state = WatchdogState(name=key, start_node=start_node, transitions=transitions, description=description)
             self.state_machine.add_state(state)
         except (ValueError, IndexError) as e:
-            print(f"Warning: Failed to parse state at line {line_num}: {key}={value}, error: {e}")
+            logger.warning("Failed to parse state at line %d: %s=%s, error: %s", line_num, key, value, e)
     
     def _parse_entry_config(self, key: str, value: str, line_num: int):
         try:
@@ -249,12 +278,12 @@ class WatchdogConfig:
             parts = [part.strip() for part in value.split(',')]
             if len(parts) < 1:
                 return
-            node_name = parts[0]
+            node_name = sys.intern(parts[0])
             description = parts[1] if len(parts) > 1 else ""
             entry = EntryNode(key, node_name, description)
             self.entry_nodes[key] = entry
         except (ValueError, IndexError) as e:
-            print(f"Warning: Failed to parse entry at line {line_num}: {key}={value}, error: {e}")
+            logger.warning("Failed to parse entry at line %d: %s=%s, error: %s", line_num, key, value, e)
 
     def _parse_completed_config(self, key: str, value: str, line_num: int):
         try:
@@ -263,12 +292,12 @@ class WatchdogConfig:
             parts = [part.strip() for part in value.split(',')]
             if len(parts) < 1:
                 return
-            node_name = parts[0]
+            node_name = sys.intern(parts[0])
             description = parts[1] if len(parts) > 1 else ""
             completion = CompletionNode(key, node_name, description)
             self.completion_nodes[key] = completion
         except (ValueError, IndexError) as e:
-            print(f"Warning: Failed to parse completed at line {line_num}: {key}={value}, error: {e}")
+            logger.warning("Failed to parse completed at line %d: %s=%s, error: %s", line_num, key, value, e)
     
     def get_state(self, name: str) -> Optional[WatchdogState]:
         return self.state_machine.states.get(name)
@@ -280,27 +309,52 @@ class WatchdogConfig:
         return self.completion_nodes.get(name)
     
     def is_entry_node(self, node_name: str) -> Optional[EntryNode]:
-        for entry in self.entry_nodes.values():
-            if entry.node_name == node_name:
-                return entry
-        return None
+        return self._entry_by_node.get(node_name)
     
     def is_completion_node(self, node_name: str) -> Optional[CompletionNode]:
-        for comp in self.completion_nodes.values():
-            if comp.node_name == node_name:
-                return comp
-        return None
+        return self._completion_by_node.get(node_name)
     
-    def is_notification_configured(self) -> bool:
-        return (self.bot_token and self.chat_id) or (self.webhook_key is not None)
+    @property
+    def bot_token(self) -> Optional[str]:
+        return self._bot_token
+    
+    @bot_token.setter
+    def bot_token(self, value: Optional[str]):
+        self._bot_token = value
+        self._refresh_notifier_cache()
+    
+    @property
+    def chat_id(self) -> Optional[str]:
+        return self._chat_id
     
-    def get_available_notifiers(self) -> List[str]:
+    @chat_id.setter
+    def chat_id(self, value: Optional[str]):
+        self._chat_id = value
+        self._refresh_notifier_cache()
+    
+    @property
+    def webhook_key(self) -> Optional[str]:
+        return self._webhook_key
+    
+    @webhook_key.setter
+    def webhook_key(self, value: Optional[str]):
+        self._webhook_key = value
+        self._refresh_notifier_cache()
+    
+    def _refresh_notifier_cache(self):
         available = []
         if self.bot_token and self.chat_id:
             available.append('telegram')
         if self.webhook_key:
             available.append('wechat')
-        return available
+        self._available_notifiers = tuple(available)
+        self._notification_configured = bool(available)
+    
+    def is_notification_configured(self) -> bool:
+        return self._notification_configured
+    
+    def get_available_notifiers(self) -> Tuple[str, ...]:
+        return self._available_notifiers
 
     def should_notify(self, event_type: str) -> bool:
         """Check if the specific event type is enabled for notification"""
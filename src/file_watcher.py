@@ -0,0 +1,82 @@
+"""
+Log file change notification (inotify on Linux)
+"""
+import os
+import sys
+import logging
+import struct
+from typing import Optional
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+logger = logging.getLogger("watchdog.file_watcher")
+
+
+class InotifyWatcher:
+    """Exposes a file descriptor that becomes readable when the watched file changes"""
+
+    def __init__(self, path: str, mask: int = IN_MODIFY | IN_MOVE_SELF | IN_DELETE_SELF):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.path = path
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            self._fd = -1
+            raise OSError(errno, f"inotify_add_watch failed: {os.strerror(errno)}")
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def drain(self) -> int:
+        """Consume all pending events, returns the OR of their masks"""
+        mask = 0
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, event_mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                mask |= event_mask
+                offset += _EVENT_HEADER.size + name_len
+        return mask
+
+    def close(self):
+        if self._fd >= 0:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = -1
+
+
+def create_file_watcher(path: str) -> Optional[InotifyWatcher]:
+    """Create a watcher for path, or None when inotify is not available"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return InotifyWatcher(path)
+    except (OSError, AttributeError) as e:
+        logger.warning("inotify unavailable, falling back to polling: %s", e)
+        return None
@@ -1,14 +1,14 @@
 """
 Log monitoring system with state machine support
 """
-import re
 import time
+import logging
+import select
 import threading
-import subprocess
 import os
 import sys
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, TextIO
+import types
+from typing import BinaryIO, Dict, Mapping, Optional, Tuple
 
 # Add current directory to Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,8 +16,19 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 from config import WatchdogConfig, EntryNode
+from file_watcher import IN_DELETE_SELF, IN_MOVE_SELF, InotifyWatcher, create_file_watcher
 from notifier import WatchdogNotifier
-from state_machine import WatchdogStateMachine, WatchdogState
+
+logger = logging.getLogger("watchdog.log_monitor")
+
+_NODE_KIND_RANK = {b'enter': 0, b'complete': 1}
+
+
+def _node_match_rank(data: bytes, match) -> int:
+    """Priority of a node_re match within its line, lower wins"""
+    if data.startswith(b'[pipeline_data.name=', match.start()):
+        return _NODE_KIND_RANK.get(match.group(2), 2)
+    return 2
 
 
 class LogMonitor:
@@ -32,36 +43,35 @@ class LogMonitor:
         self.monitor_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
         
-        # Log patterns for node detection
-        # 修复：严格匹配 [pipeline_data.name=...] | enter
-        self.node_patterns = {
-            # 优先级最高：严格匹配执行进入点
-            # 格式：[pipeline_data.name=节点名] | enter
-            'start': re.compile(r'\[pipeline_data\.name=(.*?)\]\s*\|\s*enter', re.IGNORECASE),
-            
-            # 备用：如果日志中有显式的 complete (虽然你提供的日志里 leave 没带名字，但保留以防万一)
-            'complete': re.compile(r'\[pipeline_data\.name=(.*?)\]\s*\|\s*complete', re.IGNORECASE),
-            
-            # 兼容旧格式或备用格式 (仅当上面匹配不到时使用)
-            # 这里的正则排除了 list=[...] 和 result.name=... 这种干扰项
-            'general': re.compile(r'\[(?:node_name|pipeline_data\.name)=(.*?)\](?!.*(?:list=|result\.name=))', re.IGNORECASE)
-        }
-        
         # File monitoring
-        self.log_file: Optional[TextIO] = None
+        self.log_file: Optional[BinaryIO] = None
+        self.log_file_position = 0
+        self._log_watcher: Optional[InotifyWatcher] = None
+        self._log_rotated = False
+        # Self-pipe used to interrupt select() in the monitor loop
+        self._wake_pipe: Optional[Tuple[int, int]] = None
+        
+        # Status summary, rebuilt by whoever changes the state and swapped in
+        # with a single assignment so readers never see a half-built dict;
+        # published read-only so callers cannot corrupt the shared snapshot
+        self._status_snapshot: Mapping = types.MappingProxyType(self._build_status())
     
     def start_monitoring(self) -> bool:
         """Start log monitoring"""
         if self.is_running:
-            print("Log monitor is already running")
+            logger.warning("Log monitor is already running")
             return False
         
         if not self._prepare_log_source():
-            print("Failed to prepare log source")
+            logger.error("Failed to prepare log source")
             return False
         
+        if self._log_watcher and self._wake_pipe is None:
+            self._wake_pipe = os.pipe()
+        
         self.stop_event.clear()
         self.is_running = True
+        self._publish_status()
         
         self.monitor_thread = threading.Thread(
             target=self._monitor_loop,
@@ -70,7 +80,7 @@ class LogMonitor:
         )
         self.monitor_thread.start()
         
-        print("Watchdog log monitor started")
+        logger.info("Watchdog log monitor started")
         return True
     
     def stop_monitoring(self) -> bool:
@@ -79,16 +89,24 @@ class LogMonitor:
             return False
         
         self.stop_event.set()
+        self._wake_monitor_loop()
         
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=5)
             if self.monitor_thread.is_alive():
-                print("Warning: Monitor thread did not stop gracefully")
+                logger.warning("Monitor thread did not stop gracefully")
+        
+        if self._wake_pipe and not (self.monitor_thread and self.monitor_thread.is_alive()):
+            for fd in self._wake_pipe:
+                os.close(fd)
+            self._wake_pipe = None
         
         self._cleanup_log_source()
+        self.notifier.close()
         self.is_running = False
+        self._publish_status()
         
-        print("Watchdog log monitor stopped")
+        logger.info("Watchdog log monitor stopped")
         return True
     
     def _prepare_log_source(self) -> bool:
@@ -96,25 +114,47 @@ class LogMonitor:
         if self.config.log_file_path:
             try:
                 if os.path.exists(self.config.log_file_path):
-                    self.log_file = open(self.config.log_file_path, 'r', encoding='utf-8', errors='ignore')
-                    self.log_file.seek(0, os.SEEK_END)
-                    print(f"Monitoring log file: {self.config.log_file_path}")
+                    self._open_log_file(from_start=False)
+                    logger.info("Monitoring log file: %s", self.config.log_file_path)
                     return True
                 else:
-                    print(f"Log file does not exist: {self.config.log_file_path}")
+                    logger.error("Log file does not exist: %s", self.config.log_file_path)
                     return False
             except Exception as e:
-                print(f"Failed to open log file: {e}")
+                logger.error("Failed to open log file: %s", e)
                 return False
         elif self.config.enable_stdout_capture:
-            print("Stdout capture monitoring not yet implemented")
+            logger.error("Stdout capture monitoring not yet implemented")
             return False
         else:
-            print("No log source configured")
+            logger.error("No log source configured")
             return False
     
+    def _open_log_file(self, from_start: bool):
+        """Open the configured log file and start watching it"""
+        self.log_file = open(self.config.log_file_path, 'rb', buffering=0)
+        self.log_file_position = 0 if from_start else os.fstat(self.log_file.fileno()).st_size
+        self._log_watcher = create_file_watcher(self.config.log_file_path)
+        self._log_rotated = False
+    
+    def _reopen_log_source(self) -> bool:
+        """Switch to the file now at the log path after a rotation"""
+        self._cleanup_log_source()
+        if not os.path.exists(self.config.log_file_path):
+            return False
+        try:
+            self._open_log_file(from_start=True)
+        except OSError as e:
+            logger.error("Failed to reopen log file: %s", e)
+            return False
+        logger.info("Log file rotated, reopened: %s", self.config.log_file_path)
+        return True
+    
     def _cleanup_log_source(self):
         """Cleanup log source"""
+        if self._log_watcher:
+            self._log_watcher.close()
+            self._log_watcher = None
         if self.log_file:
             try:
                 self.log_file.close()
@@ -124,141 +164,197 @@ class LogMonitor:
     
     def _monitor_loop(self):
         """Main monitoring loop"""
-        print("Starting Watchdog monitor loop...")
+        logger.info("Starting Watchdog monitor loop...")
         
-        while not self.stop_event.wait(self.config.monitor_interval):
+        while not self._wait_for_log_activity(self._next_wait_timeout()):
             try:
-                new_lines = self._read_new_log_lines()
+                data = self._read_new_log_data()
                 
-                if new_lines:
-                    for line in new_lines:
-                        self._process_log_line(line.strip())
+                if data:
+                    self._scan_chunk(data)
                 
-                self._check_timeouts()
+                if self._check_timeouts() or data:
+                    self._publish_status()
                 
             except Exception as e:
-                print(f"Monitor loop error: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Monitor loop error: %s", e)
+        
+        logger.info("Monitor loop ended")
+    
+    def _next_wait_timeout(self) -> float:
+        """Seconds to sleep: until the next state timeout, at most monitor_interval"""
+        interval = self.config.monitor_interval
+        deadline_ns = self.config.state_machine.next_deadline_ns()
+        if deadline_ns is None:
+            return interval
+        # Wake just past the deadline, timeouts fire once it has been exceeded
+        remaining = (deadline_ns - time.monotonic_ns()) / 1e9 + 0.001
+        return min(interval, max(0.0, remaining))
+    
+    def _wait_for_log_activity(self, timeout: float) -> bool:
+        """Sleep until the log file changes or timeout expires, returns True when stopping"""
+        watcher = self._log_watcher
+        if watcher is None or self._wake_pipe is None:
+            return self.stop_event.wait(timeout)
         
-        print("Monitor loop ended")
+        readable, _, _ = select.select([watcher.fileno(), self._wake_pipe[0]], [], [], timeout)
+        if watcher.fileno() in readable and watcher.drain() & (IN_MOVE_SELF | IN_DELETE_SELF):
+            self._log_rotated = True
+        return self.stop_event.is_set()
+    
+    def _wake_monitor_loop(self):
+        """Interrupt a pending select() in the monitor loop"""
+        if self._wake_pipe:
+            try:
+                os.write(self._wake_pipe[1], b'\0')
+            except OSError:
+                pass
     
-    def _read_new_log_lines(self) -> List[str]:
-        """Read new lines from log source with rotation detection"""
+    def _read_new_log_data(self) -> bytes:
+        """Read new complete lines from log source with rotation detection"""
+        if self.log_file is None and self._log_rotated:
+            self._reopen_log_source()
         if not self.log_file:
-            return []
+            return b''
         
-        lines = []
+        data = b''
         try:
-            current_pos = self.log_file.tell()
-            current_size = os.fstat(self.log_file.fileno()).st_size
-            
-            if current_size < current_pos:
-                print("[WARNING] Log file truncated detected, resetting pointer to beginning.")
-                self.log_file.seek(0)
+            fd = self.log_file.fileno()
+            current_size = os.fstat(fd).st_size
             
-            content = self.log_file.read()
+            if current_size < self.log_file_position:
+                logger.warning("Log file truncated detected, resetting pointer to beginning.")
+                self.log_file_position = 0
             
-            if content:
-                if not content.endswith('\n'):
-                    last_newline = content.rfind('\n')
-                    if last_newline != -1:
-                        bytes_to_rewind = len(content) - (last_newline + 1)
-                        self.log_file.seek(self.log_file.tell() - bytes_to_rewind)
-                        content = content[:last_newline + 1]
-                    else:
-                        self.log_file.seek(self.log_file.tell() - len(content))
-                        return []
+            if current_size > self.log_file_position:
+                # Read everything appended since the last tick in one call and
+                # only consume up to the last complete line
+                os.lseek(fd, self.log_file_position, os.SEEK_SET)
+                content = os.read(fd, current_size - self.log_file_position)
                 
-                lines = [line for line in content.split('\n') if line.strip()]
+                last_newline = content.rfind(b'\n')
+                if last_newline != -1:
+                    self.log_file_position += last_newline + 1
+                    data = content[:last_newline + 1]
+            
+            # The old file has been drained, continue with the new one. Without
+            # inotify (or if it missed the rename) notice rotation by the path
+            # now pointing at a different file
+            if self._log_rotated or (not data and self._log_path_replaced(fd)):
+                self._reopen_log_source()
                 
         except Exception as e:
-            print(f"Error reading log file: {e}")
+            logger.error("Error reading log file: %s", e)
             self._cleanup_log_source()
             self._prepare_log_source()
         
-        return lines
+        return data
     
-    def _process_log_line(self, line: str):
-        """Process a single log line"""
-        if not line:
-            return
-        
-        # 优化：如果行里不包含 pipeline_data.name 或 node_name，直接跳过，节省正则性能
-        if 'pipeline_data.name' not in line and 'node_name' not in line:
-            return
-
-        node_name = None
-        
-        # 优先匹配 start ( | enter )
-        match = self.node_patterns['start'].search(line)
-        if match:
-            node_name = match.group(1).strip()
-        else:
-            # 尝试匹配 complete
-            match = self.node_patterns['complete'].search(line)
-            if match:
-                node_name = match.group(1).strip()
-            else:
-                # 最后尝试 general，但通常 start 已经足够
-                match = self.node_patterns['general'].search(line)
-                if match:
-                    node_name = match.group(1).strip()
-        
-        if not node_name:
-            return
+    def _log_path_replaced(self, fd: int) -> bool:
+        """True if the log path now names a different file than the one open on fd"""
+        try:
+            path_stat = os.stat(self.config.log_file_path)
+        except OSError:
+            # Renamed away and not recreated yet, keep reading the old file
+            return False
+        open_stat = os.fstat(fd)
+        return (path_stat.st_ino, path_stat.st_dev) != (open_stat.st_ino, open_stat.st_dev)
+    
+    def _scan_chunk(self, data: bytes):
+        """Dispatch the node of every line in a chunk of log data that some rule reacts to"""
+        watched_nodes = self.config.watched_nodes
+        dispatch_node = self._dispatch_node
+        search = self.config.node_re.search
+        debug = logger.isEnabledFor(logging.DEBUG)
         
-        print(f"[DEBUG] Detected node execution: {node_name}")
+        pos = 0
+        while True:
+            match = search(data, pos)
+            if match is None:
+                break
+            
+            # At most one node per line: [pipeline_data.name=...] | enter wins,
+            # then | complete, then the general form, first match on ties
+            line_end = data.find(b'\n', match.start())
+            if line_end == -1:
+                line_end = len(data)
+            best, best_rank = match, _node_match_rank(data, match)
+            while best_rank:
+                other = search(data, match.end(), line_end)
+                if other is None:
+                    break
+                match = other
+                rank = _node_match_rank(data, other)
+                if rank < best_rank:
+                    best, best_rank = other, rank
+            pos = line_end + 1
+            
+            # Node names are looked up as raw bytes, so lines naming nodes no
+            # rule cares about are skipped without decoding them
+            raw_name = best.group(1).strip()
+            node_name = watched_nodes.get(raw_name)
+            if node_name is not None:
+                dispatch_node(node_name)
+            elif debug and raw_name:
+                logger.debug("Detected node execution: %s", raw_name.decode('utf-8', errors='ignore'))
+    
+    def _dispatch_node(self, node_name: str):
+        """Handle a node detected in the log"""
+        logger.debug("Detected node execution: %s", node_name)
         
         # Check if this is an entry node first
         entry_node = self.config.is_entry_node(node_name)
         if entry_node:
-            self._handle_entry_node(entry_node, node_name, line)
+            self._handle_entry_node(entry_node, node_name)
             return
         
         # Check state machine rules
-        self._check_state_machine_rules(node_name, line)
+        self._check_state_machine_rules(node_name)
     
-    def _handle_entry_node(self, entry: EntryNode, node_name: str, log_line: str):
+    def _handle_entry_node(self, entry: EntryNode, node_name: str):
         """Handle entry node detection"""
-        print(f"[ENTRY] Entry node detected: {entry.name} ({node_name})")
+        logger.info("[ENTRY] Entry node detected: %s (%s)", entry.name, node_name)
         
         active_states = self.config.state_machine.get_active_states()
         
         if active_states:
-            print(f"[ENTRY] Resetting {len(active_states)} active states due to entry node")
+            logger.info("[ENTRY] Resetting %d active states due to entry node", len(active_states))
             for state_name, state in active_states.items():
                 self.notifier.send_state_interrupted(state_name, state, node_name)
         
         self.config.state_machine.reset_all_states()
         self.notifier.send_entry_detected(entry.name, entry, node_name)
-        self._check_state_machine_rules(node_name, log_line)
+        self._check_state_machine_rules(node_name)
     
-    def _check_state_machine_rules(self, node_name: str, log_line: str):
+    def _check_state_machine_rules(self, node_name: str):
         """Check state machine rules"""
-        for state_name, state in self.config.state_machine.states.items():
-            if self.config.state_machine.activate_state(state_name, node_name):
-                print(f"[STATE] State '{state_name}' triggered by node '{node_name}'")
-                self.notifier.send_state_activated(state_name, state)
+        state_machine = self.config.state_machine
+        
+        for state_name in state_machine.states_by_start_node.get(node_name, ()):
+            if state_machine.activate_state(state_name, node_name):
+                logger.info("[STATE] State '%s' triggered by node '%s'", state_name, node_name)
+                self.notifier.send_state_activated(state_name, state_machine.states[state_name])
         
-        for state_name, state in self.config.state_machine.get_active_states().items():
-            result = self.config.state_machine.check_transition(state_name, node_name)
-            if result:
-                is_completed, message = result
-                print(f"[STATE] {message}")
-                if is_completed:
-                    self.notifier.send_state_completed(state_name, state, node_name)
+        for state_name, state, is_completed, message in state_machine.on_node(node_name):
+            logger.info("[STATE] %s", message)
+            if is_completed:
+                self.notifier.send_state_completed(state_name, state, node_name)
     
-    def _check_timeouts(self):
-        """Check for timeout conditions in state machine rules"""
-        timeouts = self.config.state_machine.check_timeouts()
+    def _check_timeouts(self) -> bool:
+        """Check for timeout conditions in state machine rules, returns True if any fired"""
+        timeouts = list(self.config.state_machine.drain_expired(time.monotonic_ns()))
+        if not timeouts:
+            return False
+        
         for state_name, state, elapsed_ms in timeouts:
-            print(f"[STATE] TIMEOUT: State '{state_name}' exceeded timeout (elapsed: {elapsed_ms}ms)")
-            self.notifier.send_state_timeout(state_name, state, elapsed_ms)
+            logger.warning("[STATE] TIMEOUT: State '%s' exceeded timeout (elapsed: %dms)", state_name, elapsed_ms)
+        # Timeouts expiring on the same tick go out as a single notification
+        self.notifier.send_state_timeout_batch(timeouts)
+        return True
     
-    def get_status(self) -> Dict:
-        """Get monitoring status"""
-        active_states = list(self.config.state_machine.get_active_states().keys())
+    def _build_status(self) -> Dict:
+        """Build the status summary from the current state"""
+        active_states = tuple(self.config.state_machine.active_states)
         return {
             'running': self.is_running,
             'total_state_rules': len(self.config.state_machine.states),
@@ -270,9 +366,22 @@ class LogMonitor:
             'notification_available': self.config.is_notification_configured()
         }
     
+    def _publish_status(self):
+        self._status_snapshot = types.MappingProxyType(self._build_status())
+    
+    def get_status(self) -> Mapping:
+        """Get monitoring status (read-only shared snapshot)"""
+        return self._status_snapshot
+    
+    def get_active_status(self) -> Dict:
+        """Get monitoring status with state details for active states only"""
+        status = dict(self.get_status())
+        status['state_details'] = self.config.state_machine.get_active_status()
+        return status
+    
     def get_detailed_status(self) -> Dict:
         """Get detailed status including state machine details"""
-        status = self.get_status()
+        status = dict(self.get_status())
         state_details = {}
         for state_name, state in self.config.state_machine.states.items():
             state_details[state_name] = self.config.state_machine.get_state_status(state_name)
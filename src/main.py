@@ -4,8 +4,12 @@ Independent log-based watchdog for monitoring MaaFw agent execution
 """
 import os
 import sys
-import time
+import queue
+import atexit
 import signal
+import logging
+import logging.handlers
+import threading
 import argparse
 from datetime import datetime
 
@@ -18,6 +22,8 @@ if current_dir not in sys.path:
 from config import load_watchdog_config, get_watchdog_config
 from log_monitor import LogMonitor
 
+logger = logging.getLogger("watchdog.main")
+
 
 class WatchdogService:
     """Main watchdog service"""
@@ -26,6 +32,7 @@ class WatchdogService:
         self.config_path = config_path or self._get_default_config_path()
         self.monitor: LogMonitor = None
         self.running = False
+        self._stop = threading.Event()
         
         # Setup signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -38,58 +45,58 @@ class WatchdogService:
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
-        print(f"\nReceived signal {signum}, shutting down...")
-        self.shutdown()
+        logger.info("Received signal %s, shutting down...", signum)
+        self._stop.set()
     
     def initialize(self) -> bool:
         """Initialize watchdog service"""
-        print("Initializing MaaFramework Watchdog...")
-        print(f"Config file: {self.config_path}")
+        logger.info("Initializing MaaFramework Watchdog...")
+        logger.info("Config file: %s", self.config_path)
         
         # Load configuration
         if not load_watchdog_config(self.config_path):
-            print("Failed to load configuration")
+            logger.error("Failed to load configuration")
             return False
         
         config = get_watchdog_config()
         
         # Validate configuration
         if not config.state_machine.states:
-            print("No watchdog states configured")
+            logger.error("No watchdog states configured")
             return False
         
         if not config.is_notification_configured():
-            print("Warning: No notification platforms configured")
+            logger.warning("No notification platforms configured")
         
         # Create log monitor
         self.monitor = LogMonitor(config)
         
-        print("Watchdog service initialized successfully")
+        logger.info("Watchdog service initialized successfully")
         return True
     
     def start(self) -> bool:
         """Start watchdog service"""
         if not self.monitor:
-            print("Watchdog not initialized")
+            logger.error("Watchdog not initialized")
             return False
         
         if self.running:
-            print("Watchdog is already running")
+            logger.error("Watchdog is already running")
             return False
         
-        print("Starting watchdog service...")
+        logger.info("Starting watchdog service...")
         
         if not self.monitor.start_monitoring():
-            print("Failed to start log monitoring")
+            logger.error("Failed to start log monitoring")
             return False
         
         self.running = True
-        print("Watchdog service started successfully")
-        print(f"Monitoring started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info("Watchdog service started successfully")
+        logger.info("Monitoring started at: %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
         # Print status
         status = self.monitor.get_status()
-        print(f"Status: {status}")
+        logger.info("Status: %s", dict(status))
         
         return True
     
@@ -98,13 +105,13 @@ class WatchdogService:
         if not self.running:
             return
         
-        print("Shutting down watchdog service...")
+        logger.info("Shutting down watchdog service...")
         
         if self.monitor:
             self.monitor.stop_monitoring()
         
         self.running = False
-        print("Watchdog service stopped")
+        logger.info("Watchdog service stopped")
     
     def run(self):
         """Run watchdog service (blocking)"""
@@ -112,16 +119,16 @@ class WatchdogService:
             return False
         
         try:
-            # Main service loop
-            while self.running:
-                time.sleep(1)
-                
-                # Optional: Print periodic status
-                # status = self.monitor.get_status()
-                # print(f"[{datetime.now().strftime('%H:%M:%S')}] Active states: {status['active_state_rules']}")
+            # Park until a shutdown signal arrives. Lock waits can't be interrupted
+            # by Ctrl+C on Windows, so wake up periodically there
+            if os.name == 'nt':
+                while not self._stop.wait(1):
+                    pass
+            else:
+                self._stop.wait()
         
         except KeyboardInterrupt:
-            print("\nKeyboard interrupt received")
+            logger.info("Keyboard interrupt received")
         
         finally:
             self.shutdown()
@@ -134,7 +141,7 @@ class WatchdogService:
             print("Watchdog not initialized")
             return
         
-        status = self.monitor.get_detailed_status()
+        status = self.monitor.get_active_status()
         config = get_watchdog_config()
         
         print("=== MaaFramework Watchdog Status ===")
@@ -157,7 +164,7 @@ class WatchdogService:
         
         print(f"Notification available: {status['notification_available']}")
         if status['notification_available']:
-            print(f"Available notifiers: {config.get_available_notifiers()}")
+            print(f"Available notifiers: {', '.join(config.get_available_notifiers())}")
         
         print("\n=== State Configuration ===")
         for state_name, state in config.state_machine.states.items():
@@ -189,12 +196,12 @@ class WatchdogService:
         print(f"Config file: {self.config_path}")
         print(f"Log source: {status['log_source']}")
         
-        print(f"\n=== State Machine Summary ===")
+        print("\n=== State Machine Summary ===")
         print(f"Total states: {status['total_state_rules']}")
         print(f"Active states: {status['active_state_rules']}")
         print(f"Total entry nodes: {status['total_entry_nodes']}")
         
-        print(f"\n=== Active States Details ===")
+        print("\n=== Active States Details ===")
         if status['active_state_rule_names']:
             for state_name in status['active_state_rule_names']:
                 state_detail = status['state_details'].get(state_name)
@@ -206,33 +213,33 @@ class WatchdogService:
                     print(f"    Current Target: {state_detail.get('current_target', 'N/A')}")
                     print(f"    Elapsed Time: {state_detail.get('elapsed_ms', 0)}ms")
                     print(f"    Remaining Time: {state_detail.get('remaining_ms', 0)}ms")
-                    print(f"    Transitions:")
+                    print("    Transitions:")
                     for i, transition in enumerate(state_detail['transitions']):
                         marker = " -> " if i == state_detail.get('current_transition_index', 0) else "    "
                         print(f"      {marker}{transition['target_node']} ({transition['timeout_ms']}ms)")
         else:
             print("  No active states")
         
-        print(f"\n=== All States Configuration ===")
+        print("\n=== All States Configuration ===")
         for state_name, state_detail in status['state_details'].items():
             active_marker = "[ACTIVE] " if state_detail['is_active'] else "[IDLE] "
             print(f"\n  {active_marker}{state_name}")
             print(f"    Start Node: {state_detail['start_node']}")
             print(f"    Description: {state_detail['description']}")
-            print(f"    Transitions:")
+            print("    Transitions:")
             for transition in state_detail['transitions']:
                 print(f"      -> {transition['target_node']} ({transition['timeout_ms']}ms)")
         
-        print(f"\n=== Entry Nodes ===")
+        print("\n=== Entry Nodes ===")
         for entry_name, entry_detail in status['entry_details'].items():
             print(f"  - {entry_name}: {entry_detail['node_name']}")
             if entry_detail['description']:
                 print(f"    Description: {entry_detail['description']}")
         
-        print(f"\n=== Notification Configuration ===")
+        print("\n=== Notification Configuration ===")
         print(f"Notification available: {status['notification_available']}")
         if status['notification_available']:
-            print(f"Available notifiers: {config.get_available_notifiers()}")
+            print(f"Available notifiers: {', '.join(config.get_available_notifiers())}")
             print(f"Default platform: {config.default_ext_notify}")
         else:
             print("No notification platforms configured")
@@ -265,6 +272,33 @@ def print_logo():
     """
     print(logo)
 
+def setup_logging(verbose: bool = False) -> logging.handlers.QueueListener:
+    """
+    Route log records through a queue so callers (monitor loop, notifier
+    workers) never block on console I/O; a listener thread does the writing.
+    The --status reports and the logo are CLI output and are printed directly.
+    """
+    log_queue = queue.SimpleQueue()
+    # stdout, like the rest of the console output, so `main.py > file` captures it
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter('%(message)s'))
+    
+    # Only our own loggers follow --verbose; libraries (urllib3, httpx, ...) stay
+    # at the root default of WARNING
+    logging.getLogger('watchdog').setLevel(logging.DEBUG if verbose else logging.INFO)
+    logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    # Flush whatever is still queued on any exit path, including sys.exit()
+    atexit.register(listener.stop)
+    return listener
+
+def flush_logging(listener: logging.handlers.QueueListener):
+    """Write out queued records so output printed directly afterwards comes after them"""
+    listener.stop()
+    listener.start()
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='MaaFramework Watchdog Service')
@@ -276,29 +310,34 @@ def main():
     
     args = parser.parse_args()
     
+    log_listener = setup_logging(args.verbose)
+    
     # Create service instance
     service = WatchdogService(args.config)
     
     # Initialize
     if not service.initialize():
-        print("Failed to initialize watchdog service")
+        logger.error("Failed to initialize watchdog service")
         sys.exit(1)
     
     # Handle status requests
     if args.detailed_status:
+        flush_logging(log_listener)
         service.print_detailed_status()
         sys.exit(0)
     
     if args.status:
+        flush_logging(log_listener)
         service.print_status()
         sys.exit(0)
     
     # Run service
-    print("Starting MaaFramework Watchdog Service...")
-    print("Press Ctrl+C to stop")
-    print("Use --status for basic status, --detailed-status for full details")
+    logger.info("Starting MaaFramework Watchdog Service...")
+    logger.info("Press Ctrl+C to stop")
+    logger.info("Use --status for basic status, --detailed-status for full details")
 
     # Print Dandelion logo
+    flush_logging(log_listener)
     print_logo()
     
     success = service.run()
@@ -2,9 +2,30 @@
 Notification system for watchdog alerts
 """
 import requests
+from requests.adapters import HTTPAdapter
 import json
-from typing import Optional
-from datetime import datetime
+import time
+import logging
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, List, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import httpx
+    import h2  # noqa: F401, needed by httpx for http2=True
+except ImportError:
+    httpx = None
+
+# Transport failures worth retrying, whichever HTTP client made the request
+_RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+if httpx is not None:
+    _RETRYABLE_ERRORS += (httpx.TransportError,)
 
 # Import constants for checking
 from config import (
@@ -15,13 +36,260 @@ from config import (
     NOTIFY_ENTRY_DETECTED
 )
 
+logger = logging.getLogger("watchdog.notifier")
+
+
+# Message templates, bound to str.format once at import
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_TIMEOUT_ALERT_TMPL = (
+    "WATCHDOG TIMEOUT ALERT\n\n"
+    "Rule: {rule_name}\n"
+    "Description: {description}\n"
+    "Start Node: {start_node}\n"
+    "Expected End Node: {end_node}\n"
+    "Timeout Threshold: {timeout_ms}ms\n"
+    "Elapsed Time: {elapsed_ms:.1f}ms\n"
+    "Last Start: {last_start}\n"
+    "Alert Time: {ts}"
+).format
+
+_RULE_ACTIVATED_TMPL = (
+    "WATCHDOG RULE ACTIVATED\n\n"
+    "Rule: {rule_name}\n"
+    "Description: {description}\n"
+    "Start Node: {start_node}\n"
+    "Timeout: {timeout_ms}ms\n"
+    "Activation Time: {ts}"
+).format
+
+_RULE_COMPLETED_TMPL = (
+    "WATCHDOG RULE COMPLETED\n\n"
+    "Rule: {rule_name}\n"
+    "End Node: {end_node}\n"
+    "Elapsed Time: {elapsed_ms:.1f}ms\n"
+    "Timeout Threshold: {timeout_ms}ms\n"
+    "Completion Time: {ts}"
+).format
+
+_STATE_ACTIVATED_TMPL = (
+    "WATCHDOG STATE ACTIVATED\n\n"
+    "State: {state_name}\n"
+    "Description: {description}\n"
+    "Start Node: {start_node}\n"
+    "Transitions: {transitions}\n"
+    "Activation Time: {ts}"
+).format
+
+_STATE_COMPLETED_TMPL = (
+    "WATCHDOG STATE COMPLETED\n\n"
+    "State: {state_name}\n"
+    "Start Node: {start_node}\n"
+    "Completion Node: {node_name}\n"
+    "Description: {description}\n"
+    "Completion Time: {ts}"
+).format
+
+_STATE_TIMEOUT_TMPL = (
+    "WATCHDOG STATE TIMEOUT\n\n"
+    "State: {state_name}\n"
+    "Start Node: {start_node}\n"
+    "Waiting For: {target_node}\n"
+    "Timeout Threshold: {timeout_ms}ms\n"
+    "Elapsed Time: {elapsed_ms}ms\n"
+    "Description: {description}\n"
+    "Alert Time: {ts}"
+).format
+
+_STATE_TIMEOUT_ITEM_TMPL = (
+    "State: {state_name}\n"
+    "Start Node: {start_node}\n"
+    "Waiting For: {target_node} ({timeout_ms}ms)\n"
+    "Elapsed Time: {elapsed_ms}ms"
+).format
+
+_STATE_TIMEOUT_BATCH_TMPL = (
+    "WATCHDOG: {count} states timed out\n\n"
+    "{blocks}\n\n"
+    "Alert Time: {ts}"
+).format
+
+_STATE_INTERRUPTED_TMPL = (
+    "WATCHDOG STATE INTERRUPTED\n\n"
+    "State: {state_name}\n"
+    "Start Node: {start_node}\n"
+    "Interrupted By: {entry_node}\n"
+    "Description: {description}\n"
+    "Interruption Time: {ts}"
+).format
+
+_ENTRY_DETECTED_TMPL = (
+    "WATCHDOG ENTRY NODE DETECTED\n\n"
+    "Entry: {entry_name}\n"
+    "Node: {node_name}\n"
+    "Description: {description}\n"
+    "Detection Time: {ts}\n\n"
+    "All active states have been reset."
+).format
+
+
+def _now_str() -> str:
+    return time.strftime(_TIME_FORMAT)
+
+
+def _state_timeout_fields(state_name: str, state, elapsed_ms: int) -> dict:
+    """Template fields describing one timed out state"""
+    current_transition = None
+    if hasattr(state, 'transitions') and hasattr(state, 'current_transition_index'):
+        if state.current_transition_index < len(state.transitions):
+            current_transition = state.transitions[state.current_transition_index]
+    
+    return {
+        'state_name': state_name,
+        'start_node': getattr(state, 'start_node', 'N/A'),
+        'target_node': getattr(current_transition, 'target_node', 'Unknown'),
+        'timeout_ms': getattr(current_transition, 'timeout_ms', 'Unknown'),
+        'elapsed_ms': elapsed_ms,
+        'description': getattr(state, 'description', 'N/A'),
+    }
+
+
+def _json_bytes(obj) -> bytes:
+    """Serialize to UTF-8 JSON bytes, non-ASCII characters kept as-is"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _create_session() -> requests.Session:
+    """Create a keep-alive session so repeated alerts reuse one TLS connection"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, pool_block=False))
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
+
+def _create_telegram_client():
+    """HTTP/2 client when httpx[http2] is installed, so bursts share one multiplexed connection"""
+    if httpx is None:
+        return _create_session()
+    return httpx.Client(
+        http2=True,
+        timeout=10,
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=120)
+    )
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    """Delay requested by a 429 response (Retry-After header or Telegram's retry_after)"""
+    value = response.headers.get('Retry-After')
+    if value is None:
+        try:
+            value = response.json().get('parameters', {}).get('retry_after')
+        except (ValueError, AttributeError):
+            return None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _post_with_retry(session, url: str, max_retries: int = 3, base: float = 1.0,
+                     cap: float = 30.0, jitter: float = 0.5,
+                     cancel: Optional[threading.Event] = None, **kwargs):
+    """
+    POST with exponential backoff and jitter
+    429, 5xx, connection errors and timeouts are retried; other responses are
+    returned as-is. Returns the last response, or re-raises the last error.
+    Setting cancel stops the backoff and gives up with the last result.
+    """
+    for attempt in range(max_retries + 1):
+        retry_after = None
+        try:
+            response = session.post(url, **kwargs)
+        except _RETRYABLE_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            last_error, response = e, None
+        else:
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt >= max_retries:
+                return response
+            if response.status_code == 429:
+                retry_after = _retry_after_seconds(response)
+        
+        delay = base * 2 ** attempt * (1 + random.random() * jitter)
+        if retry_after is not None:
+            # Never retry before the server allows it; if that is beyond cap, give up now
+            if retry_after > cap:
+                return response
+            delay = max(delay, retry_after)
+        delay = min(cap, delay)
+        
+        if cancel is None:
+            time.sleep(delay)
+        elif cancel.wait(delay):
+            if response is None:
+                raise last_error
+            return response
+
+
+class _CircuitBreaker:
+    """
+    Stops calling a platform after repeated failures
+    Opens after fail_threshold consecutive failures; once reset_after seconds
+    have passed a single probe is let through, and its result closes or re-opens it.
+    """
+    
+    def __init__(self, fail_threshold: int = 5, reset_after: float = 60.0):
+        self.fail_threshold = fail_threshold
+        self.reset_after_ns = int(reset_after * 1_000_000_000)
+        self.consecutive_failures = 0
+        self.open_until_ns = 0
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """True if a call may go through now"""
+        with self._lock:
+            if self.consecutive_failures < self.fail_threshold:
+                return True
+            now_ns = time.monotonic_ns()
+            if now_ns < self.open_until_ns:
+                return False
+            # Half-open: let this call probe, hold everyone else back until it reports
+            self.open_until_ns = now_ns + self.reset_after_ns
+            return True
+    
+    def on_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.open_until_ns = 0
+    
+    def on_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.fail_threshold:
+                self.open_until_ns = time.monotonic_ns() + self.reset_after_ns
+
+
 class TelegramNotifier:
     """Telegram notification handler"""
     
-    def __init__(self, bot_token: str, chat_id: str):
+    def __init__(self, bot_token: str, chat_id: str, client=None,
+                 cancel_event: Optional[threading.Event] = None):
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.api_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        # Any client with requests-style post()/close() works (requests.Session, httpx.Client)
+        self._owns_session = client is None
+        self.session = _create_telegram_client() if client is None else client
+        self.cancel_event = cancel_event
+    
+    def close(self):
+        """Release pooled connections"""
+        if self._owns_session:
+            self.session.close()
     
     def send_message(self, message: str) -> bool:
         """Send message via Telegram"""
@@ -32,45 +300,50 @@ class TelegramNotifier:
                 'parse_mode': 'HTML'
             }
             
-            response = requests.post(self.api_url, data=payload, timeout=10)
+            response = _post_with_retry(self.session, self.api_url, data=payload, timeout=10,
+                                        cancel=self.cancel_event)
             
             if response.status_code == 200:
                 return True
             else:
-                print(f"Telegram API error: {response.status_code}, {response.text}")
+                logger.error("Telegram API error: %s, %s", response.status_code, response.text)
                 return False
                 
         except Exception as e:
-            print(f"Telegram send error: {e}")
+            logger.error("Telegram send error: %s", e)
             return False
 
 
 class WeChatWorkNotifier:
     """WeChat Work notification handler"""
     
-    def __init__(self, webhook_key: str):
+    _HEADERS = {'Content-Type': 'application/json'}
+    # The payload wrapper never changes, only the content string is encoded per send
+    _PAYLOAD_PREFIX = b'{"msgtype":"text","text":{"content":'
+    _PAYLOAD_SUFFIX = b'}}'
+    
+    def __init__(self, webhook_key: str, cancel_event: Optional[threading.Event] = None):
         self.webhook_key = webhook_key
         self.webhook_url = f"https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key={webhook_key}"
+        self.session = _create_session()
+        self.cancel_event = cancel_event
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
     
     def send_message(self, message: str) -> bool:
         """Send message via WeChat Work"""
         try:
-            payload = {
-                "msgtype": "text",
-                "text": {
-                    "content": message
-                }
-            }
-            
-            headers = {
-                'Content-Type': 'application/json'
-            }
+            body = self._PAYLOAD_PREFIX + _json_bytes(message) + self._PAYLOAD_SUFFIX
             
-            response = requests.post(
+            response = _post_with_retry(
+                self.session,
                 self.webhook_url, 
-                data=json.dumps(payload, ensure_ascii=False).encode('utf-8'), 
-                headers=headers, 
-                timeout=10
+                data=body, 
+                headers=self._HEADERS, 
+                timeout=10,
+                cancel=self.cancel_event
             )
             
             if response.status_code == 200:
@@ -78,14 +351,14 @@ class WeChatWorkNotifier:
                 if result.get('errcode') == 0:
                     return True
                 else:
-                    print(f"WeChat Work API error: {result}")
+                    logger.error("WeChat Work API error: %s", result)
                     return False
             else:
-                print(f"WeChat Work HTTP error: {response.status_code}, {response.text}")
+                logger.error("WeChat Work HTTP error: %s, %s", response.status_code, response.text)
                 return False
                 
         except Exception as e:
-            print(f"WeChat Work send error: {e}")
+            logger.error("WeChat Work send error: %s", e)
             return False
 
 
@@ -96,195 +369,251 @@ class WatchdogNotifier:
         self.config = config
         self._telegram_notifier = None
         self._wechat_notifier = None
+        
+        # Sends run on a single FIFO worker so the monitor loop never waits on HTTP
+        # and alerts are delivered in the order they were raised
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[Future] = set()
+        # Set by close() to cut short the retry backoff of a send still in flight
+        self._closing = threading.Event()
+        
+        # Platform name -> (notifier getter, display name)
+        self._dispatch = {
+            'telegram': (self._get_telegram_notifier, 'Telegram'),
+            'wechat': (self._get_wechat_notifier, 'WeChat Work'),
+        }
+        self._breakers = {platform: _CircuitBreaker() for platform in self._dispatch}
     
     def _get_telegram_notifier(self) -> Optional[TelegramNotifier]:
         """Get Telegram notifier instance"""
-        if self._telegram_notifier is None and self.config.bot_token and self.config.chat_id:
-            self._telegram_notifier = TelegramNotifier(self.config.bot_token, self.config.chat_id)
-        return self._telegram_notifier
+        with self._lock:
+            if self._telegram_notifier is None and self.config.bot_token and self.config.chat_id:
+                self._telegram_notifier = TelegramNotifier(
+                    self.config.bot_token, self.config.chat_id, cancel_event=self._closing
+                )
+            return self._telegram_notifier
     
     def _get_wechat_notifier(self) -> Optional[WeChatWorkNotifier]:
         """Get WeChat Work notifier instance"""
-        if self._wechat_notifier is None and self.config.webhook_key:
-            self._wechat_notifier = WeChatWorkNotifier(self.config.webhook_key)
-        return self._wechat_notifier
+        with self._lock:
+            if self._wechat_notifier is None and self.config.webhook_key:
+                self._wechat_notifier = WeChatWorkNotifier(self.config.webhook_key, cancel_event=self._closing)
+            return self._wechat_notifier
     
-    def send_notification(self, message: str) -> bool:
-        """Send notification with fallback mechanism"""
-        available_platforms = self.config.get_available_notifiers()
+    def close(self, timeout: float = 5.0):
+        """
+        Wait up to timeout seconds for pending sends, drop whatever is left, and
+        close platform notifiers; everything is recreated on the next send
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+            pending = list(self._pending)
         
-        if not available_platforms:
-            # Only print warning if we actually intended to send something but couldn't
-            # print("Warning: No notification platforms available")
-            return False
+        if pool is not None:
+            _, not_done = wait(pending, timeout=timeout)
+            if not_done:
+                self._closing.set()
+                dropped = sum(1 for future in not_done if future.cancel())
+                logger.warning(
+                    "Notifier shutdown timed out: dropped %d queued notification(s), "
+                    "%d still sending", dropped, len(not_done) - dropped
+                )
+            pool.shutdown(wait=False)
         
-        # Determine try order
-        try_order = []
-        default_platform = self.config.default_ext_notify
+        with self._lock:
+            self._closing = threading.Event()
+            for notifier in (self._telegram_notifier, self._wechat_notifier):
+                if notifier is not None:
+                    notifier.close()
+            self._telegram_notifier = None
+            self._wechat_notifier = None
+    
+    def send_notification(self, message: str) -> Optional[Future]:
+        """Queue a notification, returns a Future resolving to the delivery result"""
+        if not self.config.get_available_notifiers():
+            # Only print warning if we actually intended to send something but couldn't
+            # logger.warning("No notification platforms available")
+            return None
         
-        if default_platform and default_platform in available_platforms:
-            try_order.append(default_platform)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notify")
+            future = self._pool.submit(self._send_blocking, message)
+            self._pending.add(future)
+        # Outside the lock: the callback runs right away if the send already finished
+        future.add_done_callback(self._forget_future)
+        return future
+    
+    def _forget_future(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+    
+    def _send_blocking(self, message: str) -> bool:
+        """Send notification with fallback mechanism"""
+        available_platforms = self.config.get_available_notifiers()
         
-        for platform in available_platforms:
-            if platform not in try_order:
-                try_order.append(platform)
+        # Determine try order: default platform first, then the rest, each once
+        default_platform = self.config.default_ext_notify
+        candidates = [default_platform] if default_platform in available_platforms else []
+        candidates.extend(available_platforms)
+        seen = set()
+        try_order = [p for p in candidates if not (p in seen or seen.add(p))]
         
         # Try sending notification
         for platform in try_order:
+            getter, label = self._dispatch.get(platform, (None, None))
+            if getter is None:
+                continue
+            
+            breaker = self._breakers[platform]
+            if not breaker.allow():
+                logger.warning("Skipping %s: too many recent failures", label)
+                continue
+            
             try:
-                if platform == 'telegram':
-                    notifier = self._get_telegram_notifier()
-                    if notifier and notifier.send_message(message):
-                        print(f"Watchdog notification sent via Telegram")
-                        return True
-                elif platform == 'wechat':
-                    notifier = self._get_wechat_notifier()
-                    if notifier and notifier.send_message(message):
-                        print(f"Watchdog notification sent via WeChat Work")
-                        return True
+                notifier = getter()
+                if notifier is None:
+                    continue
+                if notifier.send_message(message):
+                    breaker.on_success()
+                    logger.info("Watchdog notification sent via %s", label)
+                    return True
+                breaker.on_failure()
             except Exception as e:
-                print(f"Failed to send via {platform}: {e}")
+                breaker.on_failure()
+                logger.warning("Failed to send via %s: %s", platform, e)
                 continue
         
-        print("Failed to send watchdog notification via all platforms")
+        logger.error("Failed to send watchdog notification via all platforms")
         return False
     
     # Legacy methods for backward compatibility
-    def send_timeout_alert(self, rule_name: str, rule, elapsed_ms: float) -> bool:
+    def send_timeout_alert(self, rule_name: str, rule, elapsed_ms: float) -> Optional[Future]:
         """Send timeout alert notification (legacy support)"""
         if not self.config.should_notify(NOTIFY_STATE_TIMEOUT):
-            return False
+            return None
 
-        message = (
-            f"WATCHDOG TIMEOUT ALERT\n\n"
-            f"Rule: {rule_name}\n"
-            f"Description: {getattr(rule, 'description', 'N/A')}\n"
-            f"Start Node: {getattr(rule, 'start_node', 'N/A')}\n"
-            f"Expected End Node: {getattr(rule, 'end_node', 'N/A')}\n"
-            f"Timeout Threshold: {getattr(rule, 'timeout_ms', 'N/A')}ms\n"
-            f"Elapsed Time: {elapsed_ms:.1f}ms\n"
-            f"Last Start: {getattr(rule, 'last_start_time', datetime.now()).strftime('%Y-%m-%d %H:%M:%S')}\n"
-            f"Alert Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        alert_time = _now_str()
+        last_start = getattr(rule, 'last_start_time', None)
+        message = _TIMEOUT_ALERT_TMPL(
+            rule_name=rule_name,
+            description=getattr(rule, 'description', 'N/A'),
+            start_node=getattr(rule, 'start_node', 'N/A'),
+            end_node=getattr(rule, 'end_node', 'N/A'),
+            timeout_ms=getattr(rule, 'timeout_ms', 'N/A'),
+            elapsed_ms=elapsed_ms,
+            last_start=last_start.strftime(_TIME_FORMAT) if last_start else alert_time,
+            ts=alert_time
         )
         
         return self.send_notification(message)
     
-    def send_rule_activated(self, rule_name: str, rule) -> bool:
+    def send_rule_activated(self, rule_name: str, rule) -> Optional[Future]:
         """Send rule activation notification (legacy support)"""
         if not self.config.should_notify(NOTIFY_STATE_ACTIVATED):
-            return False
+            return None
 
-        message = (
-            f"WATCHDOG RULE ACTIVATED\n\n"
-            f"Rule: {rule_name}\n"
-            f"Description: {getattr(rule, 'description', 'N/A')}\n"
-            f"Start Node: {getattr(rule, 'start_node', 'N/A')}\n"
-            f"Timeout: {getattr(rule, 'timeout_ms', 'N/A')}ms\n"
-            f"Activation Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        message = _RULE_ACTIVATED_TMPL(
+            rule_name=rule_name,
+            description=getattr(rule, 'description', 'N/A'),
+            start_node=getattr(rule, 'start_node', 'N/A'),
+            timeout_ms=getattr(rule, 'timeout_ms', 'N/A'),
+            ts=_now_str()
         )
         
         return self.send_notification(message)
     
-    def send_rule_completed(self, rule_name: str, rule, elapsed_ms: float) -> bool:
+    def send_rule_completed(self, rule_name: str, rule, elapsed_ms: float) -> Optional[Future]:
         """Send rule completion notification (legacy support)"""
         if not self.config.should_notify(NOTIFY_STATE_COMPLETED):
-            return False
+            return None
 
-        message = (
-            f"WATCHDOG RULE COMPLETED\n\n"
-            f"Rule: {rule_name}\n"
-            f"End Node: {getattr(rule, 'end_node', 'N/A')}\n"
-            f"Elapsed Time: {elapsed_ms:.1f}ms\n"
-            f"Timeout Threshold: {getattr(rule, 'timeout_ms', 'N/A')}ms\n"
-            f"Completion Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        message = _RULE_COMPLETED_TMPL(
+            rule_name=rule_name,
+            end_node=getattr(rule, 'end_node', 'N/A'),
+            elapsed_ms=elapsed_ms,
+            timeout_ms=getattr(rule, 'timeout_ms', 'N/A'),
+            ts=_now_str()
         )
         
         return self.send_notification(message)
 
     # New state machine notification methods
-    def send_state_activated(self, state_name: str, state) -> bool:
+    def send_state_activated(self, state_name: str, state) -> Optional[Future]:
         """Send state activation notification"""
         if not self.config.should_notify(NOTIFY_STATE_ACTIVATED):
-            return False
+            return None
 
-        message = (
-            f"WATCHDOG STATE ACTIVATED\n\n"
-            f"State: {state_name}\n"
-            f"Description: {getattr(state, 'description', 'N/A')}\n"
-            f"Start Node: {getattr(state, 'start_node', 'N/A')}\n"
-            f"Transitions: {len(getattr(state, 'transitions', []))}\n"
-            f"Activation Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        message = _STATE_ACTIVATED_TMPL(
+            state_name=state_name,
+            description=getattr(state, 'description', 'N/A'),
+            start_node=getattr(state, 'start_node', 'N/A'),
+            transitions=len(getattr(state, 'transitions', [])),
+            ts=_now_str()
         )
         
         return self.send_notification(message)
 
-    def send_state_completed(self, state_name: str, state, node_name: str) -> bool:
+    def send_state_completed(self, state_name: str, state, node_name: str) -> Optional[Future]:
         """Send state completion notification"""
         if not self.config.should_notify(NOTIFY_STATE_COMPLETED):
-            return False
+            return None
 
-        message = (
-            f"WATCHDOG STATE COMPLETED\n\n"
-            f"State: {state_name}\n"
-            f"Start Node: {getattr(state, 'start_node', 'N/A')}\n"
-            f"Completion Node: {node_name}\n"
-            f"Description: {getattr(state, 'description', 'N/A')}\n"
-            f"Completion Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        message = _STATE_COMPLETED_TMPL(
+            state_name=state_name,
+            start_node=getattr(state, 'start_node', 'N/A'),
+            node_name=node_name,
+            description=getattr(state, 'description', 'N/A'),
+            ts=_now_str()
         )
         
         return self.send_notification(message)
 
-    def send_state_timeout(self, state_name: str, state, elapsed_ms: int) -> bool:
+    def send_state_timeout(self, state_name: str, state, elapsed_ms: int) -> Optional[Future]:
         """Send state timeout notification"""
-        if not self.config.should_notify(NOTIFY_STATE_TIMEOUT):
-            return False
+        return self.send_state_timeout_batch([(state_name, state, elapsed_ms)])
+    
+    def send_state_timeout_batch(self, items: List[Tuple[str, Any, int]]) -> Optional[Future]:
+        """Send one notification for several state timeouts, items are (state_name, state, elapsed_ms)"""
+        if not items or not self.config.should_notify(NOTIFY_STATE_TIMEOUT):
+            return None
 
-        current_transition = None
-        if hasattr(state, 'transitions') and hasattr(state, 'current_transition_index'):
-            if state.current_transition_index < len(state.transitions):
-                current_transition = state.transitions[state.current_transition_index]
-        
-        message = (
-            f"WATCHDOG STATE TIMEOUT\n\n"
-            f"State: {state_name}\n"
-            f"Start Node: {getattr(state, 'start_node', 'N/A')}\n"
-            f"Waiting For: {getattr(current_transition, 'target_node', 'Unknown') if current_transition else 'Unknown'}\n"
-            f"Timeout Threshold: {getattr(current_transition, 'timeout_ms', 'Unknown') if current_transition else 'Unknown'}ms\n"
-            f"Elapsed Time: {elapsed_ms}ms\n"
-            f"Description: {getattr(state, 'description', 'N/A')}\n"
-            f"Alert Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        )
+        ts = _now_str()
+        fields = [_state_timeout_fields(*item) for item in items]
+        if len(fields) == 1:
+            message = _STATE_TIMEOUT_TMPL(ts=ts, **fields[0])
+        else:
+            blocks = "\n\n".join(_STATE_TIMEOUT_ITEM_TMPL(**f) for f in fields)
+            message = _STATE_TIMEOUT_BATCH_TMPL(count=len(fields), blocks=blocks, ts=ts)
         
         return self.send_notification(message)
     
-    def send_state_interrupted(self, state_name: str, state, entry_node: str) -> bool:
+    def send_state_interrupted(self, state_name: str, state, entry_node: str) -> Optional[Future]:
         """Send state interruption notification (when entry node resets states)"""
         if not self.config.should_notify(NOTIFY_STATE_INTERRUPTED):
-            return False
+            return None
 
-        message = (
-            f"WATCHDOG STATE INTERRUPTED\n\n"
-            f"State: {state_name}\n"
-            f"Start Node: {getattr(state, 'start_node', 'N/A')}\n"
-            f"Interrupted By: {entry_node}\n"
-            f"Description: {getattr(state, 'description', 'N/A')}\n"
-            f"Interruption Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        message = _STATE_INTERRUPTED_TMPL(
+            state_name=state_name,
+            start_node=getattr(state, 'start_node', 'N/A'),
+            entry_node=entry_node,
+            description=getattr(state, 'description', 'N/A'),
+            ts=_now_str()
         )
         
         return self.send_notification(message)
     
-    def send_entry_detected(self, entry_name: str, entry, node_name: str) -> bool:
+    def send_entry_detected(self, entry_name: str, entry, node_name: str) -> Optional[Future]:
         """Send entry node detection notification"""
         if not self.config.should_notify(NOTIFY_ENTRY_DETECTED):
-            return False
+            return None
 
-        message = (
-            f"WATCHDOG ENTRY NODE DETECTED\n\n"
-            f"Entry: {entry_name}\n"
-            f"Node: {node_name}\n"
-            f"Description: {getattr(entry, 'description', 'N/A')}\n"
-            f"Detection Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-            f"All active states have been reset."
+        message = _ENTRY_DETECTED_TMPL(
+            entry_name=entry_name,
+            node_name=node_name,
+            description=getattr(entry, 'description', 'N/A'),
+            ts=_now_str()
         )
         
-        return self.send_notification(message)
\ No newline at end of file
+        return self.send_notification(message)
@@ -1,13 +1,21 @@
 """
 Watchdog State Machine for complex rule management
 """
-from typing import Dict, List, Optional, Tuple, Any, Set
+from typing import Deque, Dict, Iterator, List, Mapping, Optional, Tuple, Set
+from collections import deque
 from datetime import datetime
-import json
+import itertools
+import types
+import heapq
+import sys
+import time
 from dataclasses import dataclass, field
 
+# slots=True needs Python 3.10; older interpreters keep the regular __dict__ classes
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**_DATACLASS_SLOTS)
 class WatchdogTransition:
     """Represents a transition from current state to next state"""
     target_node: str
@@ -15,7 +23,7 @@ class WatchdogTransition:
     description: str = ""
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class WatchdogState:
     """Represents a state in the watchdog state machine"""
     name: str
@@ -23,26 +31,85 @@ class WatchdogState:
     transitions: List[WatchdogTransition] = field(default_factory=list)
     description: str = ""
     is_active: bool = False
-    last_activation_time: Optional[datetime] = None
     current_transition_index: int = 0
+    last_activation_ns: int = 0  # time.monotonic_ns() of the last (re)activation, 0 when idle
+    timer_generation: int = 0  # bumped whenever the timer is re-armed or cleared
 
 
 class WatchdogStateMachine:
     """State machine for managing complex watchdog rules"""
     
-    def __init__(self):
+    def __init__(self, history_cap: int = 10_000):
         self.states: Dict[str, WatchdogState] = {}
         self.active_states: Dict[str, WatchdogState] = {}
-        self.state_history: List[Tuple[str, str, datetime]] = []  # (rule_name, event, timestamp)
+        self._active_states_view = types.MappingProxyType(self.active_states)
+        # (rule_name, event, timestamp), oldest entries are dropped once history_cap is reached
+        self.history_cap = history_cap
+        self.state_history: Deque[Tuple[str, str, datetime]] = deque(maxlen=history_cap)
         self.completion_node_names: Set[str] = set()
         
+        # Node name -> names of states that start on / wait for that node
+        self.states_by_start_node: Dict[str, List[str]] = {}
+        self.states_by_target_node: Dict[str, List[str]] = {}
+        
+        # Node name -> active states currently waiting for it (dict keeps activation order)
+        self._node_to_waiters: Dict[str, Dict[str, None]] = {}
+        
+        # Min-heap of (deadline_ns, state_name, timer_generation); entries whose
+        # generation no longer matches the state are stale and skipped on pop
+        self._deadlines: List[Tuple[int, str, int]] = []
+        
     def set_completion_nodes(self, node_names: Set[str]):
         """Set the list of known completion nodes"""
         self.completion_node_names = node_names
     
     def add_state(self, state: WatchdogState):
         """Add a new state to the state machine"""
+        # Interned so comparisons against interned log node names are identity checks
+        state.start_node = sys.intern(state.start_node)
+        for transition in state.transitions:
+            transition.target_node = sys.intern(transition.target_node)
+        
+        old_state = self.states.get(state.name)
+        if old_state is not None:
+            self._unindex_state(old_state)
+            if old_state.is_active:
+                self._unwait(old_state)
         self.states[state.name] = state
+        self._index_state(state)
+    
+    def _index_state(self, state: WatchdogState):
+        """Register a state in the node lookup tables"""
+        self.states_by_start_node.setdefault(state.start_node, []).append(state.name)
+        for target_node in dict.fromkeys(t.target_node for t in state.transitions):
+            self.states_by_target_node.setdefault(target_node, []).append(state.name)
+    
+    def _unindex_state(self, state: WatchdogState):
+        """Remove a state from the node lookup tables"""
+        nodes = [(self.states_by_start_node, state.start_node)]
+        nodes += [(self.states_by_target_node, t.target_node) for t in state.transitions]
+        for index, node_name in nodes:
+            names = index.get(node_name)
+            if names and state.name in names:
+                names.remove(state.name)
+                if not names:
+                    del index[node_name]
+    
+    def _wait(self, state: WatchdogState):
+        """Register a state as waiting for the target of its current transition"""
+        if state.current_transition_index < len(state.transitions):
+            target_node = state.transitions[state.current_transition_index].target_node
+            self._node_to_waiters.setdefault(target_node, {})[state.name] = None
+    
+    def _unwait(self, state: WatchdogState):
+        """Undo _wait, call before current_transition_index changes"""
+        if state.current_transition_index < len(state.transitions):
+            target_node = state.transitions[state.current_transition_index].target_node
+            waiters = self._node_to_waiters.get(target_node)
+            if waiters is not None:
+                waiters.pop(state.name, None)
+                if not waiters:
+                    del self._node_to_waiters[target_node]
     
     def activate_state(self, state_name: str, trigger_node: str) -> bool:
         """Activate a state when its start_node is triggered"""
@@ -53,21 +120,22 @@ class WatchdogStateMachine:
         if trigger_node != state.start_node:
             return False
         
-        current_time = datetime.now()
-        
         # If already active, reset the timer
         if state.is_active:
-            state.last_activation_time = current_time
+            self._unwait(state)
             state.current_transition_index = 0
-            self.state_history.append((state_name, f"RESET by {trigger_node}", current_time))
+            self._wait(state)
+            self._arm_timer(state)
+            self.state_history.append((state_name, f"RESET by {trigger_node}", datetime.now()))
             return True
         
         # Activate the state
         state.is_active = True
-        state.last_activation_time = current_time
         state.current_transition_index = 0
         self.active_states[state_name] = state
-        self.state_history.append((state_name, f"ACTIVATED by {trigger_node}", current_time))
+        self._wait(state)
+        self._arm_timer(state)
+        self.state_history.append((state_name, f"ACTIVATED by {trigger_node}", datetime.now()))
         return True
     
     def check_transition(self, state_name: str, node_name: str) -> Optional[Tuple[bool, str]]:
@@ -75,67 +143,119 @@ class WatchdogStateMachine:
         Check if a node triggers a transition for an active state
         Returns: (is_completed, message)
         """
-        if state_name not in self.active_states:
+        state = self.active_states.get(state_name)
+        if state is None:
             return None
         
-        state = self.active_states[state_name]
-        if not state.transitions or state.current_transition_index >= len(state.transitions):
+        transitions = state.transitions
+        index = state.current_transition_index
+        if index >= len(transitions):
             return None
         
-        current_transition = state.transitions[state.current_transition_index]
+        # Fast path: most nodes are not the one this state is waiting for
+        if node_name != transitions[index].target_node:
+            return None
         
-        if node_name == current_transition.target_node:
-            current_time = datetime.now()
+        # Check if this is the last transition in the chain
+        if index >= len(transitions) - 1:
+            # LOGIC UPDATE: Handle Loops and Explicit Completions
             
-            # Check if this is the last transition in the chain
-            if state.current_transition_index >= len(state.transitions) - 1:
-                # LOGIC UPDATE: Handle Loops and Explicit Completions
-                
-                # Case 1: Explicit Completion Node -> Finish and Remove
-                if node_name in self.completion_node_names:
-                    self._deactivate_state(state_name, f"COMPLETED by {node_name}")
-                    return (True, f"Rule '{state_name}' completed successfully at explicit completion node")
-                
-                # Case 2: Start Node == End Node (Loop) -> Reset and Keep Active
-                elif node_name == state.start_node:
-                    state.current_transition_index = 0
-                    state.last_activation_time = current_time
-                    self.state_history.append((state_name, f"LOOP RESET by {node_name}", current_time))
-                    return (False, f"Rule '{state_name}' loop reset by start/end node match")
-                
-                # Case 3: Default Behavior (Linear Rule) -> Finish and Remove
-                # For backward compatibility with tests like Begin->Mid where Mid is not a completion node
-                else:
-                    self._deactivate_state(state_name, f"COMPLETED by {node_name}")
-                    return (True, f"Rule '{state_name}' completed successfully (Implicit)")
+            # Case 1: Explicit Completion Node -> Finish and Remove
+            if node_name in self.completion_node_names:
+                self._deactivate_state(state_name, f"COMPLETED by {node_name}")
+                return (True, f"Rule '{state_name}' completed successfully at explicit completion node")
+            
+            # Case 2: Start Node == End Node (Loop) -> Reset and Keep Active
+            elif node_name == state.start_node:
+                self._unwait(state)
+                state.current_transition_index = 0
+                self._wait(state)
+                self._arm_timer(state)
+                self.state_history.append((state_name, f"LOOP RESET by {node_name}", datetime.now()))
+                return (False, f"Rule '{state_name}' loop reset by start/end node match")
             
+            # Case 3: Default Behavior (Linear Rule) -> Finish and Remove
+            # For backward compatibility with tests like Begin->Mid where Mid is not a completion node
             else:
-                # Move to next transition
-                state.current_transition_index += 1
-                state.last_activation_time = current_time
-                next_transition = state.transitions[state.current_transition_index]
-                self.state_history.append((state_name, f"TRANSITION to {next_transition.target_node}", current_time))
-                return (False, f"Rule '{state_name}' moved to next transition: {next_transition.target_node}")
+                self._deactivate_state(state_name, f"COMPLETED by {node_name}")
+                return (True, f"Rule '{state_name}' completed successfully (Implicit)")
         
-        return None
+        # Move to next transition
+        self._unwait(state)
+        state.current_transition_index = index + 1
+        self._wait(state)
+        self._arm_timer(state)
+        next_transition = transitions[index + 1]
+        self.state_history.append((state_name, f"TRANSITION to {next_transition.target_node}", datetime.now()))
+        return (False, f"Rule '{state_name}' moved to next transition: {next_transition.target_node}")
+    
+    def on_node(self, node_name: str) -> List[Tuple[str, WatchdogState, bool, str]]:
+        """
+        Feed a node to the active states waiting for it
+        Returns: (state_name, state, is_completed, message) for every state it moved
+        """
+        waiters = self._node_to_waiters.get(node_name)
+        if not waiters:
+            return []
+        
+        results = []
+        # Snapshot: check_transition re-registers states as they advance
+        for state_name in tuple(waiters):
+            state = self.active_states[state_name]
+            result = self.check_transition(state_name, node_name)
+            if result:
+                results.append((state_name, state) + result)
+        return results
     
     def check_timeouts(self) -> List[Tuple[str, WatchdogState, int]]:
         """Check for timeout conditions, returns list of (state_name, state, elapsed_ms)"""
-        current_time = datetime.now()
-        timeouts = []
+        return list(self.drain_expired(time.monotonic_ns()))
+    
+    def drain_expired(self, now_ns: int) -> Iterator[Tuple[str, WatchdogState, int]]:
+        """Deactivate and yield (state_name, state, elapsed_ms) for every state whose deadline is before now_ns"""
+        heappop = heapq.heappop
+        get_active = self.active_states.get
         
-        for state_name, state in list(self.active_states.items()):
-            if not state.last_activation_time or state.current_transition_index >= len(state.transitions):
+        # self._deadlines is re-read each pass: the consumer may arm timers between
+        # items, and compaction in _arm_timer replaces the list
+        while self._deadlines and self._deadlines[0][0] < now_ns:
+            _, state_name, generation = heappop(self._deadlines)
+            state = get_active(state_name)
+            if state is None or state.timer_generation != generation:
                 continue
             
-            current_transition = state.transitions[state.current_transition_index]
-            elapsed_ms = (current_time - state.last_activation_time).total_seconds() * 1000
-            
-            if elapsed_ms > current_transition.timeout_ms:
-                timeouts.append((state_name, state, int(elapsed_ms)))
-                self._deactivate_state(state_name, f"TIMEOUT after {elapsed_ms:.1f}ms")
+            elapsed_ns = now_ns - state.last_activation_ns
+            self._deactivate_state(state_name, f"TIMEOUT after {elapsed_ns / 1_000_000:.1f}ms")
+            yield state_name, state, elapsed_ns // 1_000_000
+    
+    def next_deadline_ns(self) -> Optional[int]:
+        """Monotonic time of the earliest pending timeout, or None when nothing is armed"""
+        deadlines = self._deadlines
+        while deadlines:
+            _, state_name, generation = deadlines[0]
+            state = self.active_states.get(state_name)
+            if state is not None and state.timer_generation == generation:
+                return deadlines[0][0]
+            heapq.heappop(deadlines)
+        return None
+    
+    def _arm_timer(self, state: WatchdogState):
+        """Restart the timer of a state for its current transition"""
+        now_ns = time.monotonic_ns()
+        state.last_activation_ns = now_ns
+        state.timer_generation += 1
         
-        return timeouts
+        if state.current_transition_index < len(state.transitions):
+            timeout_ms = state.transitions[state.current_transition_index].timeout_ms
+            heapq.heappush(self._deadlines, (now_ns + timeout_ms * 1_000_000, state.name, state.timer_generation))
+            
+            # Loop states re-arm far more often than they expire; drop stale entries
+            if len(self._deadlines) > 4 * len(self.states) + 64:
+                self._deadlines = [
+                    entry for entry in self._deadlines
+                    if entry[1] in self.active_states and self.active_states[entry[1]].timer_generation == entry[2]
+                ]
+                heapq.heapify(self._deadlines)
     
     def reset_all_states(self):
         """Reset all active states (used by entry nodes)"""
@@ -146,15 +266,29 @@ class WatchdogStateMachine:
         """Deactivate a state"""
         if state_name in self.active_states:
             state = self.active_states[state_name]
+            self._unwait(state)
             state.is_active = False
-            state.last_activation_time = None
+            state.last_activation_ns = 0
+            state.timer_generation += 1
             state.current_transition_index = 0
             del self.active_states[state_name]
             self.state_history.append((state_name, reason, datetime.now()))
+            
+            # Every remaining heap entry is stale once nothing is active
+            if not self.active_states:
+                self._deadlines.clear()
+    
+    def get_history(self, n: int = 100) -> List[Tuple[str, str, datetime]]:
+        """Get the n most recent history entries, newest first"""
+        return list(itertools.islice(reversed(self.state_history), n))
+    
+    def get_active_states(self) -> Mapping[str, WatchdogState]:
+        """Get a read-only live view of the currently active states, copy it before changing states"""
+        return self._active_states_view
     
-    def get_active_states(self) -> Dict[str, WatchdogState]:
-        """Get all currently active states"""
-        return self.active_states.copy()
+    def get_active_status(self) -> Dict[str, Dict]:
+        """Get detailed status of the currently active states only"""
+        return {name: self.get_state_status(name) for name in list(self.active_states)}
     
     def get_state_status(self, state_name: str) -> Optional[Dict]:
         """Get detailed status of a specific state"""
@@ -184,9 +318,9 @@ class WatchdogStateMachine:
                 status['current_target'] = current_transition.target_node
                 status['current_timeout'] = current_transition.timeout_ms
                 
-                if state.last_activation_time:
-                    elapsed = (datetime.now() - state.last_activation_time).total_seconds() * 1000
-                    status['elapsed_ms'] = int(elapsed)
-                    status['remaining_ms'] = max(0, current_transition.timeout_ms - int(elapsed))
+                if state.last_activation_ns:
+                    elapsed = (time.monotonic_ns() - state.last_activation_ns) // 1_000_000
+                    status['elapsed_ms'] = elapsed
+                    status['remaining_ms'] = max(0, current_transition.timeout_ms - elapsed)
         
         return status
\ No newline at end of file